@@ -1,6 +1,7 @@
 import os
+import re
 import traceback
-from flask import Flask, render_template, request, redirect, send_from_directory, jsonify, after_this_request
+from flask import Flask, render_template, request, redirect, send_file, jsonify, after_this_request
 from pptx import Presentation
 from pptx.enum.text import PP_ALIGN
 from pptx.enum.shapes import MSO_SHAPE_TYPE
@@ -11,32 +12,88 @@ from werkzeug.utils import secure_filename
 import gc
 import time
 from deep_translator import GoogleTranslator
+from deep_translator.exceptions import TooManyRequests, RequestError
+import requests
 import signal
 from functools import wraps
 from threading import Event
 import tempfile
 import shutil
 import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor, wait
 import psutil
 import sys
+import cProfile
+import pstats
+import tracemalloc
+import hmac
+import io
+import marshal
+import uuid
 from pympler import summary, muppy
+from storage import create_storage
 
 UPLOAD_FOLDER = 'uploads'
 CONVERTED_FOLDER = 'converted'
 CHUNK_FOLDER = 'chunks'
+PROFILE_FOLDER = 'profiles'
 MAX_FILE_AGE = 300  # 5 minutes in seconds
 CHUNK_SIZE = 512 * 1024  # 512KB chunk size for uploads - increased for better performance
 MAX_SLIDES_PER_BATCH = 2  # Process 2 slides at a time
 MEMORY_CLEANUP_DELAY = 0.5  # 0.5 second delay between memory cleanups - reduced for better performance
+TRANSLATION_WORKERS = 3  # Concurrent translator requests per conversion - kept low for the free Google endpoint
+TRANSLATION_RETRIES = 2  # Retries for rate-limited or failed translator requests
+TRANSLATION_RETRY_DELAY = 1  # Seconds before the first retry, grows with each attempt
+PIPELINE_QUEUE_SIZE = 4  # Formatted slides waiting for write-back before formatting blocks
+PROFILE_TOP_ALLOCATIONS = 10  # tracemalloc entries recorded per profiled stage
+PROFILE_MAX_SUMMARIES = 2  # Full pympler summaries per job, each one walks every object in the process
+PROFILE_SUMMARY_GROWTH = 1.5  # Memory growth since the last pympler summary before taking another
+PROFILE_MAX_AGE = 24 * 60 * 60  # 24 hours - profiles are debugging artifacts, kept longer than jobs
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')  # Required to request profiling, profiling is disabled when unset
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local')  # local, tmpfs, memory, tiered or s3
+STORAGE_TMPFS_ROOT = os.environ.get('STORAGE_TMPFS_ROOT', '/dev/shm/slide_harmony')  # RAM-backed root for hot files
+SMALL_FILE_SIZE = int(os.environ.get('STORAGE_SMALL_FILE_SIZE', 8 * 1024 * 1024))  # 8MB - files below this stay in memory
 
-# Create necessary directories
-for folder in [UPLOAD_FOLDER, CONVERTED_FOLDER, CHUNK_FOLDER]:
-    os.makedirs(folder, exist_ok=True)
+# Translation classes for the skip-translation pre-filter
+TEXT_TRANSLATE = 'translate'  # Needs a translator round-trip
+TEXT_TRANSLITERATE = 'transliterate'  # Only digits need converting, no network call
+TEXT_PASSTHROUGH = 'passthrough'  # Leave the text untouched
+
+# Precompiled Unicode-range checks used by classify_text
+ARABIC_LETTER_RE = re.compile(r'[\u0620-\u064A\u066E-\u06D3\u06D5\u06EE\u06EF\u06FA-\u06FF\u0750-\u077F\u08A0-\u08FF\uFB50-\uFDFF\uFE70-\uFEFC]')
+LATIN_LETTER_RE = re.compile(r'[A-Za-z\u00C0-\u00D6\u00D8-\u00F6\u00F8-\u024F]')  # Skips × and ÷
+DIGIT_RE = re.compile(r'[0-9\u0660-\u0669\u06F0-\u06F9]')
+URL_RE = re.compile(r'^(?:[a-z][a-z0-9+.-]*://|www\.)\S+$', re.IGNORECASE)
+# Bare domains like example.com/pricing, limited to common TLDs so words joined by a dot still translate
+DOMAIN_RE = re.compile(
+    r'^(?:[a-z0-9-]+\.)+(?:com|org|net|edu|gov|int|io|co|ai|app|dev|info|biz|me|tv|uk|us'
+    r'|sa|ae|eg|jo|lb|kw|qa|bh|om|ma|dz|tn|iq|sy|ps|ye|ly|sd)(?:[/:?#]\S*)?$',
+    re.IGNORECASE
+)
+EMAIL_RE = re.compile(r'^[\w.+-]+@[\w-]+(?:\.[\w-]+)+$')
+DIRECTION_MARKS_RE = re.compile(r'[\u200B-\u200F\u202A-\u202E\u2066-\u2069\uFEFF]')
+TO_ARABIC_DIGITS = str.maketrans('0123456789', '٠١٢٣٤٥٦٧٨٩')
+TO_WESTERN_DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹٫٬٪', '01234567890123456789.,%')  # Arabic decimal, thousands and percent signs too
+
+# Storage for uploads, chunks and converted files
+file_storage = create_storage(
+    STORAGE_BACKEND,
+    namespaces=[UPLOAD_FOLDER, CONVERTED_FOLDER, CHUNK_FOLDER, PROFILE_FOLDER],
+    tmpfs_root=STORAGE_TMPFS_ROOT,
+    small_file_size=SMALL_FILE_SIZE,
+    hot_namespaces=[CHUNK_FOLDER],
+    s3_bucket=os.environ.get('S3_BUCKET'),
+    s3_prefix=os.environ.get('S3_PREFIX', ''),
+    s3_endpoint_url=os.environ.get('S3_ENDPOINT_URL')
+)
+print(f"[Startup] Using {STORAGE_BACKEND} storage backend")
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['CONVERTED_FOLDER'] = CONVERTED_FOLDER
 app.config['CHUNK_FOLDER'] = CHUNK_FOLDER
+app.config['PROFILE_FOLDER'] = PROFILE_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = None  # Remove global limit
 app.config['MAX_CHUNK_SIZE'] = CHUNK_SIZE
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0  # Disable caching
@@ -74,6 +131,21 @@ def handle_abort(signal, frame):
 # Register signal handler
 signal.signal(signal.SIGINT, handle_abort)
 
+# Marks the end of the conversion pipeline queue
+PIPELINE_DONE = object()
+
+# Per-thread translators for the translation pool
+translator_local = threading.local()
+
+# Translator errors worth retrying: rate limits and network failures
+TRANSIENT_TRANSLATION_ERRORS = (TooManyRequests, RequestError, requests.exceptions.RequestException)
+
+# Guards the per-job translator call counters updated from the pool
+translator_calls_lock = threading.Lock()
+
+# tracemalloc and cProfile are process-wide, so only one job is profiled at a time
+profiling_lock = threading.Lock()
+
 def log_memory_usage(tag=""):
     """Log current memory usage"""
     process = psutil.Process(os.getpid())
@@ -91,20 +163,141 @@ def force_memory_cleanup():
     time.sleep(MEMORY_CLEANUP_DELAY)
 
 def cleanup_old_files():
-    """Clean up files older than MAX_FILE_AGE seconds"""
-    current_time = time.time()
+    """Clean up files older than MAX_FILE_AGE seconds, profiles older than PROFILE_MAX_AGE"""
+    for namespace in [UPLOAD_FOLDER, CONVERTED_FOLDER, CHUNK_FOLDER]:
+        file_storage.cleanup(namespace, MAX_FILE_AGE)
+    
+    file_storage.cleanup(PROFILE_FOLDER, PROFILE_MAX_AGE)
+
+class ConversionProfiler:
+    """Opt-in memory and CPU profiling for a single conversion job"""
+    
+    def __init__(self, job_name):
+        self.job_name = job_name
+        self.profile = cProfile.Profile()
+        self.stages = []
+        self.last_snapshot = None
+        self.peak_memory = 0
+        self.peak_stage = None
+        self.peak_summary = None
+        self.started_tracemalloc = False
+        self.thread_profiles = {}
+        self.thread_profiles_lock = threading.Lock()
+        self.active = False
+        self.summary_count = 0
+        self.overhead = 0.0  # Seconds spent profiling, not counted towards the conversion timeout
+    
+    def start(self):
+        """Start tracing allocations and CPU time, must be called from the conversion thread"""
+        start_time = time.time()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracemalloc = True
+        self.last_snapshot = self.take_snapshot()
+        self.active = True
+        self.overhead += time.time() - start_time
+        self.profile.enable()
+    
+    def profile_thread(self, func):
+        """Wrap a pipeline stage run on the pool or writer thread so its CPU time is profiled too"""
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            # Before Python 3.12 cProfile only sees the thread that enabled it,
+            # from 3.12 on the conversion thread's profile already covers every thread
+            if not self.active or sys.version_info >= (3, 12):
+                return func(*args, **kwargs)
+            with self.thread_profiles_lock:
+                profile = self.thread_profiles.setdefault(threading.get_ident(), cProfile.Profile())
+            return profile.runcall(func, *args, **kwargs)
+        return wrapper
     
-    for folder in [UPLOAD_FOLDER, CONVERTED_FOLDER, CHUNK_FOLDER]:
-        for filename in os.listdir(folder):
-            filepath = os.path.join(folder, filename)
-            if os.path.isfile(filepath):
-                file_age = current_time - os.path.getmtime(filepath)
-                if file_age > MAX_FILE_AGE:
-                    try:
-                        os.remove(filepath)
-                        print(f"[Cleanup] Removed old file: {filepath}")
-                    except Exception as e:
-                        print(f"[Cleanup] Error removing {filepath}: {e}")
+    def take_snapshot(self):
+        """Take a tracemalloc snapshot without the profiler's own allocations"""
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, os.path.join(os.path.dirname(muppy.__file__), '*')),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+    
+    def mark_stage(self, stage):
+        """Record the top allocations and peak of the stage, and a pympler summary when memory grew a lot"""
+        # Keep the profiler's own work out of the CPU profile
+        self.profile.disable()
+        start_time = time.time()
+        try:
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = self.take_snapshot()
+            top_allocations = snapshot.compare_to(self.last_snapshot, 'lineno')[:PROFILE_TOP_ALLOCATIONS]
+            self.stages.append((stage, current, peak, top_allocations))
+            self.last_snapshot = snapshot
+            
+            # A full summary is expensive on large decks, so only a few are taken
+            if (self.summary_count < PROFILE_MAX_SUMMARIES
+                    and current > self.peak_memory * PROFILE_SUMMARY_GROWTH):
+                self.peak_stage = stage
+                self.peak_summary = summary.summarize(muppy.get_objects())
+                self.summary_count += 1
+                # Measure after the summary so its own leftovers don't trigger the next one
+                self.peak_memory = max(current, tracemalloc.get_traced_memory()[0])
+        except Exception as e:
+            log_error(e, f"Error profiling stage {stage}")
+        finally:
+            # Each stage reports its own peak, not spikes from earlier stages
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            self.overhead += time.time() - start_time
+            self.profile.enable()
+    
+    def stop(self):
+        """Record the final stage and stop tracing"""
+        self.mark_stage("Finished")
+        self.active = False
+        self.profile.disable()
+        self.last_snapshot = None
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+    
+    def write_report(self, storage, namespace):
+        """Store the text report and the raw pstats dump, returns their filenames"""
+        start_time = time.time()
+        report_filename = f"{self.job_name}_profile.txt"
+        stats_filename = f"{self.job_name}.prof"
+        report = io.StringIO()
+        
+        report.write(f"Profile for conversion job: {self.job_name}\n")
+        
+        report.write("\n=== tracemalloc top allocations by stage ===\n")
+        for stage, current, peak, top_allocations in self.stages:
+            report.write(f"\n[{stage}] Current: {current / (1024 * 1024):.2f} MB, Peak: {peak / (1024 * 1024):.2f} MB\n")
+            for stat in top_allocations:
+                report.write(f"  {stat}\n")
+        
+        report.write(f"\n=== pympler object summary at the largest summarised stage boundary ({self.peak_stage}) ===\n")
+        if self.peak_summary:
+            for line in summary.format_(self.peak_summary, limit=20):
+                report.write(f"{line}\n")
+        
+        # Merge the conversion thread with the translation pool and write-back threads,
+        # sorted by own time so blocking calls higher up don't hide the hotspots
+        report.write("\n=== cProfile (tottime, all pipeline threads) ===\n")
+        stats = pstats.Stats(self.profile, stream=report)
+        for profile in self.thread_profiles.values():
+            stats.add(profile)
+        stats.sort_stats('tottime').print_stats(40)
+        
+        # Same format as pstats.Stats.dump_stats, loadable with pstats or snakeviz
+        storage.save(namespace, stats_filename, io.BytesIO(marshal.dumps(stats.stats)))
+        storage.save(namespace, report_filename, io.BytesIO(report.getvalue().encode('utf-8')))
+        
+        self.overhead += time.time() - start_time
+        return report_filename, stats_filename
+
+def is_admin_request():
+    """Check the admin token sent with the request"""
+    if not ADMIN_TOKEN:
+        return False
+    token = request.headers.get('X-Admin-Token') or request.form.get('admin_token', '')
+    return hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8'))
 
 def log_error(error, context=""):
     """Helper function to log errors with context"""
@@ -134,6 +327,35 @@ def convert_number_to_arabic(text):
             
     return arabic_text.strip()
 
+def classify_text(text, direction):
+    """Classify text as translate, transliterate-only or passthrough before it reaches the translator"""
+    core = DIRECTION_MARKS_RE.sub('', text).strip()
+    if not core:
+        return TEXT_PASSTHROUGH
+    
+    # URLs and emails must never be translated
+    if URL_RE.match(core) or DOMAIN_RE.match(core) or EMAIL_RE.match(core):
+        return TEXT_PASSTHROUGH
+    
+    # Only text containing letters of the source script needs the translator,
+    # anything already in the target script is left as it is
+    source_letter_re = LATIN_LETTER_RE if direction == 'en_to_ar' else ARABIC_LETTER_RE
+    if source_letter_re.search(core):
+        return TEXT_TRANSLATE
+    
+    # Numbers, dates and percentages only need their digits converted
+    if DIGIT_RE.search(core):
+        return TEXT_TRANSLITERATE
+    
+    # Punctuation, bullet glyphs and symbols
+    return TEXT_PASSTHROUGH
+
+def transliterate_digits(text, direction):
+    """Convert digits to the target script without a translator round-trip"""
+    if direction == 'en_to_ar':
+        return text.translate(TO_ARABIC_DIGITS)
+    return text.translate(TO_WESTERN_DIGITS)
+
 def process_text_frame_format(text_frame, direction):
     """Process text frame formatting only"""
     try:
@@ -270,22 +492,89 @@ def process_shape_format(shape, slide_width, direction, in_group=False):
     except Exception as e:
         log_error(e, "Error processing shape format")
 
-def convert_pptx(input_path, output_path, slide_indices=None, direction='en_to_ar'):
+def get_thread_translator(direction):
+    """Get the translator for the current thread - GoogleTranslator keeps per-request state and is not thread-safe"""
+    translator = getattr(translator_local, direction, None)
+    if translator is None:
+        translator = GoogleTranslator(source='en', target='ar') if direction == 'en_to_ar' else GoogleTranslator(source='ar', target='en')
+        setattr(translator_local, direction, translator)
+    return translator
+
+def translate_text(text, direction, call_counts):
+    """Translation stage: translate a single string on the I/O pool, retrying transient errors"""
+    translator = get_thread_translator(direction)
+    for attempt in range(TRANSLATION_RETRIES + 1):
+        with translator_calls_lock:
+            call_counts['calls'] += 1
+        try:
+            return translator.translate(text)
+        except TRANSIENT_TRANSLATION_ERRORS as e:
+            if attempt == TRANSLATION_RETRIES or check_abort():
+                raise
+            print(f"[Translation Warning] Retrying translation after error: {e}")
+            time.sleep(TRANSLATION_RETRY_DELAY * (attempt + 1))
+
+def translation_failed(future):
+    """Check if a finished translation future failed or came back empty"""
+    if not future.done() or future.cancelled():
+        return False
+    return future.exception() is not None or not future.result()
+
+def apply_slide_translations(slide_index, pending_runs, translation_futures, translation_futures_lock, reported_texts):
+    """Write-back stage: apply the finished translations of one slide to its runs"""
+    for run, text, future in pending_runs:
+        if check_abort() or future.cancelled():
+            continue
+        try:
+            translated_text = future.result()
+            if translated_text and translated_text is not None:
+                run.text = translated_text
+                continue
+            if text not in reported_texts:
+                print(f"[Translation Warning] Empty translation result for text: {text}")
+        except Exception as e:
+            if text not in reported_texts:
+                print(f"[Translation Error] Failed to translate text: {text}: {e}")
+        reported_texts.add(text)
+        
+        # Drop the failed result so later runs with the same text are retried,
+        # unless the formatting stage has already resubmitted it
+        with translation_futures_lock:
+            if translation_futures.get(text) is future:
+                del translation_futures[text]
+    print(f"[Conversion] Translations written back for slide {slide_index}")
+
+def write_back_translations(write_queue, translation_futures, translation_futures_lock, apply_translations):
+    """Write-back stage: wait for each formatted slide's translations, then apply them"""
+    reported_texts = set()  # Log each failing text once, not once per run
+    while True:
+        item = write_queue.get()
+        if item is PIPELINE_DONE:
+            break
+        
+        slide_index, pending_runs = item
+        # Wait outside apply_translations so a profiled write-back only records real work,
+        # futures cancelled on abort count as done
+        wait([future for _, _, future in pending_runs])
+        apply_translations(slide_index, pending_runs, translation_futures, translation_futures_lock, reported_texts)
+
+def convert_pptx(input_filename, output_filename, slide_indices=None, direction='en_to_ar', profiler=None):
     try:
-        print(f"[Conversion] Starting conversion from {input_path} to {output_path}")
+        print(f"[Conversion] Starting conversion from {input_filename} to {output_filename}")
+        start_time = time.time()
         
         # Reset abort flag at start of conversion
         reset_abort()
         
-        # Initialize translator
-        translator = GoogleTranslator(source='en', target='ar') if direction == 'en_to_ar' else GoogleTranslator(source='ar', target='en')
-        
-        # Load presentation with minimal memory usage
-        prs = Presentation(input_path)
+        # Load presentation with minimal memory usage, python-pptx reads all parts on open
+        with file_storage.open(UPLOAD_FOLDER, input_filename) as input_file:
+            prs = Presentation(input_file)
         slide_width = prs.slide_width
         total_slides = len(prs.slides)
         
         print(f"[Conversion] Total slides: {total_slides}")
+        if profiler:
+            profiler.mark_stage("Load presentation")
         
         if slide_indices:
             slide_indices = [i for i in slide_indices if 1 <= i <= total_slides]
@@ -293,82 +582,129 @@ def convert_pptx(input_path, output_path, slide_indices=None, direction='en_to_a
         else:
             print(f"[Conversion] Processing all slides")
         
-        # Translation cache to avoid repeating translations
-        translation_cache = {}
+        # Translation futures by source text, so each distinct text is only sent once
+        translation_futures = {}
+        translation_futures_lock = threading.Lock()  # Shared with the write-back stage, which evicts failures
+        
+        # Counters for the skip-translation pre-filter
+        classification_counts = {TEXT_TRANSLATE: 0, TEXT_TRANSLITERATE: 0, TEXT_PASSTHROUGH: 0}
+        translator_call_counts = {'calls': 0}
+        
+        # Pipeline: formatting runs in this thread and feeds the translation pool,
+        # the write-back thread applies results for slides already formatted.
+        # The bounded queue stops formatting from running too far ahead.
+        translation_pool = ThreadPoolExecutor(max_workers=TRANSLATION_WORKERS, thread_name_prefix='translate')
+        write_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        translate = profiler.profile_thread(translate_text) if profiler else translate_text
+        apply_translations = profiler.profile_thread(apply_slide_translations) if profiler else apply_slide_translations
+        writer_thread = threading.Thread(
+            target=write_back_translations,
+            args=(write_queue, translation_futures, translation_futures_lock, apply_translations)
+        )
+        writer_thread.daemon = True
+        writer_thread.start()
+        formatting_done = False
+        format_time = 0.0
         
         # Process slides in smaller batches to reduce memory usage
         batch_size = 3  # Process 3 slides at a time
         
-        # Process all slides for formatting and translation
-        for batch_start in range(1, total_slides + 1, batch_size):
-            batch_end = min(batch_start + batch_size - 1, total_slides)
-            print(f"[Conversion] Processing slide batch {batch_start}-{batch_end}")
-            
-            # Save progress after each batch
-            should_save = False
-            
-            for slide_index in range(batch_start, batch_end + 1):
-                # Check for abort signal
-                if check_abort():
-                    print("[Conversion] Process aborted by user")
-                    raise Exception("Process aborted by user")
-                    
-                if slide_indices and slide_index not in slide_indices:
-                    continue
-                    
-                print(f"[Conversion] Processing slide {slide_index}/{total_slides}")
-                slide = prs.slides[slide_index - 1]  # 0-based index
+        try:
+            # Format all slides and queue their text for translation
+            for batch_start in range(1, total_slides + 1, batch_size):
+                batch_end = min(batch_start + batch_size - 1, total_slides)
+                print(f"[Conversion] Processing slide batch {batch_start}-{batch_end}")
                 
-                # Process each shape in the slide
-                for shape in slide.shapes:
+                for slide_index in range(batch_start, batch_end + 1):
+                    # Check for abort signal
                     if check_abort():
                         print("[Conversion] Process aborted by user")
                         raise Exception("Process aborted by user")
+                        
+                    if slide_indices and slide_index not in slide_indices:
+                        continue
+                        
+                    print(f"[Conversion] Processing slide {slide_index}/{total_slides}")
+                    slide_start = time.time()
+                    slide = prs.slides[slide_index - 1]  # 0-based index
+                    pending_runs = []
                     
-                    # Process formatting
-                    process_shape_format(shape, slide_width, direction)
+                    # Process each shape in the slide
+                    for shape in slide.shapes:
+                        if check_abort():
+                            print("[Conversion] Process aborted by user")
+                            raise Exception("Process aborted by user")
+                        
+                        # Process formatting
+                        process_shape_format(shape, slide_width, direction)
+                        
+                        # Queue translation if shape has text
+                        if shape.has_text_frame:
+                            for paragraph in shape.text_frame.paragraphs:
+                                for run in paragraph.runs:
+                                    text = run.text.strip()
+                                    if text and text is not None:  # Only translate non-empty, non-None text
+                                        # Skip the translator for runs that need no network translation
+                                        text_class = classify_text(text, direction)
+                                        classification_counts[text_class] += 1
+                                        if text_class == TEXT_PASSTHROUGH:
+                                            continue
+                                        if text_class == TEXT_TRANSLITERATE:
+                                            run.text = transliterate_digits(run.text, direction)
+                                            continue
+                                        
+                                        # Only successful or pending translations are reused
+                                        with translation_futures_lock:
+                                            future = translation_futures.get(text)
+                                            if future is None or translation_failed(future):
+                                                future = translation_pool.submit(translate, text, direction, translator_call_counts)
+                                                translation_futures[text] = future
+                                        pending_runs.append((run, text, future))
                     
-                    # Process translation if shape has text
-                    if shape.has_text_frame:
-                        for paragraph in shape.text_frame.paragraphs:
-                            for run in paragraph.runs:
-                                text = run.text.strip()
-                                if text and text is not None:  # Only translate non-empty, non-None text
-                                    try:
-                                        # Check cache first
-                                        if text in translation_cache:
-                                            run.text = translation_cache[text]
-                                        else:
-                                            translated_text = translator.translate(text)
-                                            if translated_text and translated_text is not None:
-                                                run.text = translated_text
-                                                # Cache the translation
-                                                translation_cache[text] = translated_text
-                                            else:
-                                                print(f"[Translation Warning] Empty translation result for text: {text}")
-                                    except Exception as e:
-                                        print(f"[Translation Error] Failed to translate text: {e}")
-                                        continue
+                    format_time += time.time() - slide_start
+                    
+                    # Hand the slide to the write-back stage, blocks while the queue is full
+                    write_queue.put((slide_index, pending_runs))
                 
-                # Mark that we should save progress
-                should_save = True
-            
-            # Force memory cleanup after each batch
-            force_memory_cleanup()
-            
-            # Save progress after each batch
-            if should_save:
-                try:
-                    prs.save(output_path)
-                    print(f"[Conversion] Saved progress after slide batch {batch_start}-{batch_end}")
-                except Exception as e:
-                    log_error(e, "Error saving progress")
+                if profiler:
+                    profiler.mark_stage(f"Format slide batch {batch_start}-{batch_end}")
+                
+                # Force memory cleanup after each batch
+                force_memory_cleanup()
             
-            # Clear some memory between batches
-            del translation_cache
-            translation_cache = {}
+            formatting_done = True
+        finally:
+            # Drain the pipeline, dropping queued translations if formatting did not finish
+            if not formatting_done:
+                translation_pool.shutdown(wait=False, cancel_futures=True)
+            write_queue.put(PIPELINE_DONE)
+            writer_thread.join()
+            translation_pool.shutdown(wait=True)
+            del translation_futures
             gc.collect()
         
+        if profiler:
+            profiler.mark_stage("Write back translations")
+        
+        if check_abort():
+            print("[Conversion] Process aborted by user")
+            raise Exception("Process aborted by user")
+        
+        # Small decks stay in memory until they reach storage, large ones spill to a temp file
+        with tempfile.SpooledTemporaryFile(max_size=SMALL_FILE_SIZE) as output_file:
+            prs.save(output_file)
+            output_file.seek(0)
+            file_storage.save(CONVERTED_FOLDER, output_filename, output_file)
+        print(f"[Conversion] Saved converted presentation to {output_filename}")
+        if profiler:
+            profiler.mark_stage("Save presentation")
+        
+        print(f"[Conversion] Text classification: {classification_counts[TEXT_TRANSLATE]} needed translation, "
+              f"{classification_counts[TEXT_TRANSLITERATE]} transliterated, "
+              f"{classification_counts[TEXT_PASSTHROUGH]} passed through")
+        print(f"[Conversion] Translator calls: {translator_call_counts['calls']}")
+        print(f"[Conversion] Finished in {time.time() - start_time:.2f}s (formatting {format_time:.2f}s)")
+        
         return 'completed'
     except Exception as e:
         if str(e) == "Process aborted by user":
@@ -378,20 +714,28 @@ def convert_pptx(input_path, output_path, slide_indices=None, direction='en_to_a
     finally:
         # Ensure we clean up the input file and force garbage collection
         try:
-            if os.path.exists(input_path):
-                os.remove(input_path)
+            file_storage.delete(UPLOAD_FOLDER, input_filename)
             force_memory_cleanup()
         except Exception as e:
             log_error(e, "Error cleaning up input file")
 
-def assemble_chunks(chunk_files, output_path):
+def chunk_name(filename, chunk_index):
+    """Storage name of an uploaded chunk"""
+    return f'{filename}.chunk_{chunk_index}'
+
+def assemble_chunks(chunk_names, output_filename):
     """Assemble uploaded chunks into a single file"""
     try:
-        with open(output_path, 'wb') as outfile:
-            for chunk_file in sorted(chunk_files):
-                with open(chunk_file, 'rb') as infile:
-                    outfile.write(infile.read())
-                os.remove(chunk_file)  # Delete chunk after use
+        # Small decks are assembled in memory, large ones spill to a temp file
+        with tempfile.SpooledTemporaryFile(max_size=SMALL_FILE_SIZE) as outfile:
+            for name in chunk_names:
+                with file_storage.open(CHUNK_FOLDER, name) as infile:
+                    shutil.copyfileobj(infile, outfile)
+            outfile.seek(0)
+            file_storage.save(UPLOAD_FOLDER, output_filename, outfile)
+        
+        for name in chunk_names:
+            file_storage.delete(CHUNK_FOLDER, name)  # Delete chunks after use
         return True
     except Exception as e:
         log_error(e, "Error assembling chunks")
@@ -404,23 +748,13 @@ def check_request_size():
         return  # Skip size check for chunk uploads
 
 def cleanup_on_startup():
-    """Clean up all temporary files on startup"""
+    """Clean up expired temporary files on startup"""
     print("[Startup] Cleaning up temporary directories...")
     try:
-        # Clean up upload folder
-        for folder in [UPLOAD_FOLDER, CONVERTED_FOLDER, CHUNK_FOLDER]:
-            if os.path.exists(folder):
-                for filename in os.listdir(folder):
-                    filepath = os.path.join(folder, filename)
-                    try:
-                        if os.path.isfile(filepath):
-                            os.remove(filepath)
-                            print(f"[Startup] Removed file: {filepath}")
-                        elif os.path.isdir(filepath):
-                            shutil.rmtree(filepath)
-                            print(f"[Startup] Removed directory: {filepath}")
-                    except Exception as e:
-                        print(f"[Startup] Error removing {filepath}: {e}")
+        # Every worker runs this on import and tmpfs, tiered and s3 storage are
+        # shared between workers, so only remove files past their age limit
+        # instead of deleting jobs another worker is still processing
+        cleanup_old_files()
         print("[Startup] Cleanup complete")
     except Exception as e:
         print(f"[Startup] Error during cleanup: {e}")
@@ -464,39 +798,32 @@ def upload_chunk():
 
         print(f"[Upload] Processing chunk {chunk_index + 1}/{total_chunks} for file: {sanitized_filename}")
 
-        # Create a temporary directory for chunks if it doesn't exist
-        chunk_dir = os.path.join(app.config['CHUNK_FOLDER'], sanitized_filename)
-        os.makedirs(chunk_dir, exist_ok=True)
+        # A single-chunk upload is the whole file, store it directly
+        if total_chunks == 1:
+            file_storage.save(UPLOAD_FOLDER, sanitized_filename, file.stream)
+            print(f"[Upload] Saved single-chunk upload: {sanitized_filename}")
+            return jsonify({
+                'message': 'File upload complete',
+                'filename': sanitized_filename
+            }), 200
 
         # Save the chunk
-        chunk_path = os.path.join(chunk_dir, f'chunk_{chunk_index}')
-        file.save(chunk_path)
-        print(f"[Upload] Saved chunk {chunk_index} to: {chunk_path}")
+        file_storage.save(CHUNK_FOLDER, chunk_name(sanitized_filename, chunk_index), file.stream)
+        print(f"[Upload] Saved chunk {chunk_index} of: {sanitized_filename}")
 
         # If this is the last chunk, combine all chunks
         if chunk_index == total_chunks - 1:
             print("[Upload] Last chunk received, combining chunks...")
-            final_path = os.path.join(app.config['UPLOAD_FOLDER'], sanitized_filename)
+            chunk_names = [chunk_name(sanitized_filename, i) for i in range(total_chunks)]
             
-            try:
-                with open(final_path, 'wb') as outfile:
-                    for i in range(total_chunks):
-                        chunk_path = os.path.join(chunk_dir, f'chunk_{i}')
-                        with open(chunk_path, 'rb') as infile:
-                            outfile.write(infile.read())
-                print(f"[Upload] Successfully combined chunks into: {final_path}")
-
-                # Clean up chunks
-                shutil.rmtree(chunk_dir)
-                print("[Upload] Cleaned up chunk directory")
-
-                return jsonify({
-                    'message': 'File upload complete',
-                    'filename': sanitized_filename
-                }), 200
-            except Exception as e:
-                print(f"[Upload] Error combining chunks: {str(e)}")
-                return jsonify({'error': f'Error combining chunks: {str(e)}'}), 500
+            if not assemble_chunks(chunk_names, sanitized_filename):
+                return jsonify({'error': 'Error combining chunks'}), 500
+            print(f"[Upload] Successfully combined chunks into: {sanitized_filename}")
+
+            return jsonify({
+                'message': 'File upload complete',
+                'filename': sanitized_filename
+            }), 200
 
         return jsonify({
             'message': f'Chunk {chunk_index + 1}/{total_chunks} uploaded successfully'
@@ -517,8 +844,8 @@ def abort_conversion():
 
 @app.route('/convert', methods=['POST'])
 def convert():
-    input_path = None
-    output_path = None
+    input_filename = None
+    output_filename = None
     
     try:
         print("[Convert] Starting conversion process")
@@ -537,20 +864,20 @@ def convert():
         sanitized_filename = secure_filename(original_filename)
         print(f"[Convert] Original filename: {original_filename}, Sanitized: {sanitized_filename}")
             
-        # Use the assembled file from the upload folder with sanitized filename
-        input_path = os.path.join(app.config['UPLOAD_FOLDER'], sanitized_filename)
-        if not os.path.exists(input_path):
-            print("[Convert] Input file not found:", input_path)
+        # Use the assembled file from upload storage with sanitized filename
+        input_filename = sanitized_filename
+        if not file_storage.exists(UPLOAD_FOLDER, input_filename):
+            print("[Convert] Input file not found:", input_filename)
             # Try to find the file with different filename variations
-            possible_files = os.listdir(app.config['UPLOAD_FOLDER'])
-            print(f"[Convert] Available files in upload folder: {possible_files}")
+            possible_files = file_storage.list(UPLOAD_FOLDER)
+            print(f"[Convert] Available files in upload storage: {possible_files}")
             
             # Check if there's a similarly named file
             similar_files = [f for f in possible_files if f.lower().startswith(sanitized_filename.lower().split('.')[0])]
             if similar_files:
                 print(f"[Convert] Found similar files: {similar_files}")
-                input_path = os.path.join(app.config['UPLOAD_FOLDER'], similar_files[0])
-                print(f"[Convert] Using alternative file: {input_path}")
+                input_filename = similar_files[0]
+                print(f"[Convert] Using alternative file: {input_filename}")
             else:
                 return jsonify({'status': 'error', 'message': 'Input file not found'}), 400
 
@@ -559,13 +886,19 @@ def convert():
             print("[Convert] No output name provided")
             return jsonify({'status': 'error', 'message': 'No output name provided'}), 400
 
-        print("[Convert] Processing file:", os.path.basename(input_path))
+        print("[Convert] Processing file:", input_filename)
 
         slide_nums_raw = request.form.get('slideNumbers', '')
         conversion_direction = request.form.get('conversionDirection', 'en_to_ar')
         enable_translation = request.form.get('translationToggle', 'true').lower() == 'true'
         print("[Convert] Conversion direction:", conversion_direction)
         print("[Convert] Translation enabled:", enable_translation)
+        
+        # Profiling is opt-in per job and restricted to admins
+        profile_requested = request.form.get('profile', 'false').lower() == 'true'
+        if profile_requested and not is_admin_request():
+            print("[Convert] Profiling requested without a valid admin token")
+            return jsonify({'status': 'error', 'message': 'Profiling requires admin access'}), 403
 
         # Process slide numbers
         slide_indices = None
@@ -578,32 +911,54 @@ def convert():
                 slide_indices = None
 
         output_filename = secure_filename(output_name) + '.pptx'
-        output_path = os.path.join(app.config['CONVERTED_FOLDER'], output_filename)
-        print("[Convert] Output path:", output_path)
+        print("[Convert] Output file:", output_filename)
 
         # Convert with memory optimization
         log_memory_usage("Before Conversion")
         gc.collect()  # Force garbage collection before processing
         print("[Convert] Starting conversion process")
         
+        profiler = None
+        profile_files = None
+        if profile_requested:
+            if profiling_lock.acquire(blocking=False):
+                # Unique per job so jobs with the same output name don't overwrite each other's reports
+                profiler = ConversionProfiler(f"{os.path.splitext(output_filename)[0]}_{uuid.uuid4().hex[:8]}")
+                print("[Convert] Profiling enabled for this job")
+            else:
+                print("[Convert] Another job is being profiled, running without profiling")
+        
         # Run the conversion in a separate thread to prevent worker timeout
         def run_conversion():
-            nonlocal input_path, output_path, slide_indices, conversion_direction
+            nonlocal input_filename, output_filename, slide_indices, conversion_direction, profile_files
             try:
-                status = convert_pptx(
-                    input_path=input_path,
-                    output_path=output_path,
-                    slide_indices=slide_indices,
-                    direction=conversion_direction
-                )
+                try:
+                    if profiler:
+                        profiler.start()
+                    status = convert_pptx(
+                        input_filename=input_filename,
+                        output_filename=output_filename,
+                        slide_indices=slide_indices,
+                        direction=conversion_direction,
+                        profiler=profiler
+                    )
+                finally:
+                    if profiler:
+                        try:
+                            profiler.stop()
+                            profile_files = profiler.write_report(file_storage, PROFILE_FOLDER)
+                            print("[Convert] Profile written:", profile_files)
+                        except Exception as e:
+                            log_error(e, "Error writing conversion profile")
+                        finally:
+                            profiling_lock.release()
                 print("[Convert] Conversion status:", status)
                 log_memory_usage("After Conversion")
                 
                 # Clean up input file after successful conversion
                 try:
-                    if os.path.exists(input_path):
-                        os.remove(input_path)
-                        print("[Convert] Input file cleaned up")
+                    file_storage.delete(UPLOAD_FOLDER, input_filename)
+                    print("[Convert] Input file cleaned up")
                     gc.collect()
                 except Exception as e:
                     print("[Convert] Error cleaning up input file:", str(e))
@@ -616,8 +971,13 @@ def convert():
         conversion_thread.daemon = True
         conversion_thread.start()
         
-        # Wait for the thread to finish with a timeout
-        conversion_thread.join(timeout=600)  # 10 minute timeout
+        # Wait for the thread to finish with a timeout, time spent profiling doesn't count
+        deadline = time.time() + 600  # 10 minute timeout
+        while True:
+            remaining = deadline + (profiler.overhead if profiler else 0) - time.time()
+            conversion_thread.join(timeout=max(remaining, 0))
+            if not conversion_thread.is_alive() or remaining <= 0:
+                break
         
         if conversion_thread.is_alive():
             # Thread is still running, which means it's taking too long
@@ -628,19 +988,24 @@ def convert():
             }), 500
 
         print("[Convert] Conversion completed successfully")
-        return jsonify({
+        response = {
             'status': 'completed',
             'download_url': f'/download/{output_filename}'
-        })
+        }
+        if profile_files:
+            report_filename, stats_filename = profile_files
+            response['profile_report_url'] = f'/profile/{report_filename}'
+            response['profile_stats_url'] = f'/profile/{stats_filename}'
+        return jsonify(response)
 
     except Exception as e:
         print("[Convert] Error during conversion:", str(e))
         # Clean up files in case of error
         try:
-            if input_path and os.path.exists(input_path):
-                os.remove(input_path)
-            if output_path and os.path.exists(output_path):
-                os.remove(output_path)
+            if input_filename:
+                file_storage.delete(UPLOAD_FOLDER, input_filename)
+            if output_filename:
+                file_storage.delete(CONVERTED_FOLDER, output_filename)
             gc.collect()  # Force garbage collection after error
             log_memory_usage("After Error")
         except Exception as cleanup_error:
@@ -650,16 +1015,15 @@ def convert():
         log_error(e, "Error during request processing")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
-def delayed_delete(file_path, delay=10):
-    """Delete a file after a delay to ensure it's no longer in use"""
+def delayed_delete(namespace, filename, delay=10):
+    """Delete a stored file after a delay to ensure it's no longer in use"""
     def delete_file():
         time.sleep(delay)  # Wait for download to complete
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                print(f"[Cleanup] Successfully deleted file: {file_path}")
+            file_storage.delete(namespace, filename)
+            print(f"[Cleanup] Successfully deleted file: {namespace}/{filename}")
         except Exception as e:
-            print(f"[Cleanup Error] Failed to delete file {file_path}: {e}")
+            print(f"[Cleanup Error] Failed to delete file {namespace}/{filename}: {e}")
     
     # Start deletion in a separate thread
     thread = threading.Thread(target=delete_file)
@@ -669,22 +1033,23 @@ def delayed_delete(file_path, delay=10):
 @app.route('/download/<filename>')
 def download_file(filename):
     try:
-        file_path = os.path.join(app.config['CONVERTED_FOLDER'], filename)
+        filename = secure_filename(filename)
         
-        if not os.path.exists(file_path):
+        try:
+            converted_file = file_storage.open(CONVERTED_FOLDER, filename)
+        except FileNotFoundError:
             return jsonify({'status': 'error', 'message': 'File not found'}), 404
 
-        # Send the file
-        response = send_from_directory(
-            app.config['CONVERTED_FOLDER'],
-            filename,
+        # Send the file, it is closed once the response has been sent
+        response = send_file(
+            converted_file,
             as_attachment=True,
             download_name=filename,
             mimetype='application/vnd.openxmlformats-officedocument.presentationml.presentation'
         )
 
         # Schedule file deletion after download
-        delayed_delete(file_path)
+        delayed_delete(CONVERTED_FOLDER, filename)
 
         return response
 
@@ -692,6 +1057,32 @@ def download_file(filename):
         log_error(e, "Error during file download")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/profile/<filename>')
+def download_profile(filename):
+    """Download a profiling report or pstats dump, admin only"""
+    try:
+        if not is_admin_request():
+            return jsonify({'status': 'error', 'message': 'Admin access required'}), 403
+        
+        filename = secure_filename(filename)
+        
+        try:
+            profile_file = file_storage.open(PROFILE_FOLDER, filename)
+        except FileNotFoundError:
+            return jsonify({'status': 'error', 'message': 'File not found'}), 404
+        
+        mimetype = 'text/plain' if filename.endswith('.txt') else 'application/octet-stream'
+        return send_file(
+            profile_file,
+            as_attachment=True,
+            download_name=filename,
+            mimetype=mimetype
+        )
+    
+    except Exception as e:
+        log_error(e, "Error during profile download")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5005))
     app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
@@ -1,4 +1,5 @@
 import multiprocessing
+import os
 
 # Server socket
 bind = "0.0.0.0:10000"
@@ -42,4 +43,14 @@ graceful_timeout = 90  # Give workers 90 seconds to finish processing requests
 # Memory optimization
 limit_request_line = 0  # No limit on the size of the HTTP request line
 limit_request_fields = 100  # Maximum number of HTTP headers
-limit_request_field_size = 0  # No limit on the size of the HTTP header 
\ No newline at end of file
+limit_request_field_size = 0  # No limit on the size of the HTTP header 
+
+# Storage checks
+def on_starting(server):
+    """Refuse to start process-local memory storage with more than one worker"""
+    storage_backend = os.environ.get('STORAGE_BACKEND', 'local')
+    if storage_backend == 'memory' and server.cfg.workers > 1:
+        raise RuntimeError(
+            "STORAGE_BACKEND=memory keeps files inside one worker process and "
+            f"cannot be used with {server.cfg.workers} workers, use tiered or tmpfs instead"
+        )
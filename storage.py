@@ -0,0 +1,372 @@
+import os
+import io
+import time
+import shutil
+import tempfile
+import threading
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:  # boto3 is only needed for the S3 backend
+    boto3 = None
+    ClientError = None
+
+COPY_BUFFER_SIZE = 1024 * 1024  # 1MB buffer when copying between files
+
+
+def get_stream_size(fileobj):
+    """Get the size of a seekable stream without moving its position"""
+    position = fileobj.tell()
+    fileobj.seek(0, io.SEEK_END)
+    size = fileobj.tell() - position
+    fileobj.seek(position)
+    return size
+
+
+class StorageBackend:
+    """Base class for storing uploads, chunks and converted files.
+
+    Files are addressed by a namespace (uploads, converted, chunks) and a
+    flat filename. Missing files raise FileNotFoundError on every backend.
+    """
+
+    def save(self, namespace, name, fileobj):
+        """Store the contents of a readable stream from its current position"""
+        raise NotImplementedError
+
+    def open(self, namespace, name):
+        """Open a stored file for reading, returns a seekable binary stream"""
+        raise NotImplementedError
+
+    def exists(self, namespace, name):
+        """Check if a file is stored"""
+        raise NotImplementedError
+
+    def delete(self, namespace, name):
+        """Delete a stored file, missing files are ignored"""
+        raise NotImplementedError
+
+    def list(self, namespace):
+        """List the filenames stored in a namespace"""
+        raise NotImplementedError
+
+    def age(self, namespace, name):
+        """Seconds since a stored file was last written"""
+        raise NotImplementedError
+
+    def cleanup(self, namespace, max_age):
+        """Delete files older than max_age seconds"""
+        for name in self.list(namespace):
+            try:
+                if self.age(namespace, name) > max_age:
+                    self.delete(namespace, name)
+                    print(f"[Cleanup] Removed old file: {namespace}/{name}")
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                print(f"[Cleanup] Error removing {namespace}/{name}: {e}")
+
+
+class LocalDiskStorage(StorageBackend):
+    """Files stored in one directory per namespace under a root directory"""
+
+    def __init__(self, root, namespaces):
+        self.root = root
+        for namespace in namespaces:
+            os.makedirs(os.path.join(root, namespace), exist_ok=True)
+
+    def path(self, namespace, name):
+        return os.path.join(self.root, namespace, name)
+
+    def save(self, namespace, name, fileobj):
+        # Write to a temporary name first so readers never see a partial file
+        path = self.path(namespace, name)
+        temp_path = f"{path}.{threading.get_ident()}.part"
+        try:
+            with open(temp_path, 'wb') as outfile:
+                shutil.copyfileobj(fileobj, outfile, COPY_BUFFER_SIZE)
+            os.replace(temp_path, path)
+        except Exception:
+            # e.g. a client disconnecting mid-chunk, don't leave the partial file behind
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def open(self, namespace, name):
+        return open(self.path(namespace, name), 'rb')
+
+    def exists(self, namespace, name):
+        return os.path.isfile(self.path(namespace, name))
+
+    def delete(self, namespace, name):
+        try:
+            os.remove(self.path(namespace, name))
+        except FileNotFoundError:
+            pass
+
+    def list(self, namespace):
+        folder = os.path.join(self.root, namespace)
+        if not os.path.isdir(folder):
+            return []
+        return [
+            name for name in os.listdir(folder)
+            if os.path.isfile(os.path.join(folder, name)) and not name.endswith('.part')
+        ]
+
+    def age(self, namespace, name):
+        return time.time() - os.path.getmtime(self.path(namespace, name))
+
+    def cleanup(self, namespace, max_age):
+        # Also remove stale partial saves and leftover directories, e.g. chunk
+        # folders from older versions, once they are past max_age
+        folder = os.path.join(self.root, namespace)
+        if not os.path.isdir(folder):
+            return
+        current_time = time.time()
+        for name in os.listdir(folder):
+            path = os.path.join(folder, name)
+            try:
+                if current_time - os.path.getmtime(path) <= max_age:
+                    continue
+                if os.path.isfile(path):
+                    os.remove(path)
+                    print(f"[Cleanup] Removed old file: {path}")
+                elif os.path.isdir(path):
+                    shutil.rmtree(path)
+                    print(f"[Cleanup] Removed old directory: {path}")
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                print(f"[Cleanup] Error removing {path}: {e}")
+
+class TmpfsStorage(LocalDiskStorage):
+    """Local storage on a RAM-backed filesystem for hot intermediate files"""
+
+    def __init__(self, root, namespaces):
+        # Fall back to the system temp directory where /dev/shm does not exist
+        parent = os.path.dirname(root.rstrip(os.sep))
+        if not os.path.isdir(parent):
+            root = os.path.join(tempfile.gettempdir(), os.path.basename(root.rstrip(os.sep)))
+            print(f"[Storage] {parent} not available, using {root} for hot files")
+        super().__init__(root, namespaces)
+
+
+class MemoryStorage(StorageBackend):
+    """Files kept in process memory.
+
+    Only visible to the worker process that stored them, so it can only be used
+    with a single worker - gunicorn_config.py refuses to start otherwise.
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.lock = threading.Lock()
+
+    def save(self, namespace, name, fileobj):
+        data = fileobj.read()
+        with self.lock:
+            self.files[(namespace, name)] = (data, time.time())
+
+    def open(self, namespace, name):
+        with self.lock:
+            entry = self.files.get((namespace, name))
+        if entry is None:
+            raise FileNotFoundError(f"{namespace}/{name}")
+        return io.BytesIO(entry[0])
+
+    def exists(self, namespace, name):
+        with self.lock:
+            return (namespace, name) in self.files
+
+    def delete(self, namespace, name):
+        with self.lock:
+            self.files.pop((namespace, name), None)
+
+    def list(self, namespace):
+        with self.lock:
+            return [name for file_namespace, name in self.files if file_namespace == namespace]
+
+    def age(self, namespace, name):
+        with self.lock:
+            entry = self.files.get((namespace, name))
+        if entry is None:
+            raise FileNotFoundError(f"{namespace}/{name}")
+        return time.time() - entry[1]
+
+
+class TieredStorage(StorageBackend):
+    """Routes files between backends by namespace and size.
+
+    Hot namespaces (chunks) go to the hot backend, files below small_file_size
+    to the small backend and everything else to the large backend.
+    """
+
+    def __init__(self, hot, small, large, small_file_size, hot_namespaces):
+        self.hot = hot
+        self.small = small
+        self.large = large
+        self.small_file_size = small_file_size
+        self.hot_namespaces = set(hot_namespaces)
+
+    def backends(self):
+        """Unique backends in lookup order"""
+        backends = []
+        for backend in (self.small, self.hot, self.large):
+            if backend not in backends:
+                backends.append(backend)
+        return backends
+
+    def find(self, namespace, name):
+        for backend in self.backends():
+            if backend.exists(namespace, name):
+                return backend
+        raise FileNotFoundError(f"{namespace}/{name}")
+
+    def save(self, namespace, name, fileobj):
+        if namespace in self.hot_namespaces:
+            target = self.hot
+        elif get_stream_size(fileobj) < self.small_file_size:
+            target = self.small
+        else:
+            target = self.large
+
+        target.save(namespace, name, fileobj)
+
+        # Drop copies left in other tiers so reads always see the latest file,
+        # only once the new copy is stored so a failed save keeps the old one
+        for backend in self.backends():
+            if backend is not target:
+                backend.delete(namespace, name)
+
+    def open(self, namespace, name):
+        return self.find(namespace, name).open(namespace, name)
+
+    def exists(self, namespace, name):
+        return any(backend.exists(namespace, name) for backend in self.backends())
+
+    def delete(self, namespace, name):
+        for backend in self.backends():
+            backend.delete(namespace, name)
+
+    def list(self, namespace):
+        names = []
+        for backend in self.backends():
+            names.extend(name for name in backend.list(namespace) if name not in names)
+        return names
+
+    def age(self, namespace, name):
+        return self.find(namespace, name).age(namespace, name)
+
+    def cleanup(self, namespace, max_age):
+        for backend in self.backends():
+            backend.cleanup(namespace, max_age)
+
+
+class S3Storage(StorageBackend):
+    """Files stored in an S3-compatible bucket, one key prefix per namespace.
+
+    endpoint_url points the client at any S3-compatible server, such as a
+    local MinIO or moto server in development.
+    """
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, spool_size=8 * 1024 * 1024):
+        if boto3 is None:
+            raise RuntimeError("The S3 storage backend requires boto3, install it with: pip install boto3")
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.spool_size = spool_size
+        self.client = boto3.client('s3', endpoint_url=endpoint_url)
+
+    def key(self, namespace, name):
+        return '/'.join(part for part in (self.prefix, namespace, name) if part)
+
+    def head(self, namespace, name):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self.key(namespace, name))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                raise FileNotFoundError(f"{namespace}/{name}") from e
+            raise
+
+    def save(self, namespace, name, fileobj):
+        self.client.upload_fileobj(fileobj, self.bucket, self.key(namespace, name))
+
+    def open(self, namespace, name):
+        # Small objects stay in memory, large ones spill to a temporary file
+        spool = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+        try:
+            self.client.download_fileobj(self.bucket, self.key(namespace, name), spool)
+        except ClientError as e:
+            spool.close()
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                raise FileNotFoundError(f"{namespace}/{name}") from e
+            raise
+        spool.seek(0)
+        return spool
+
+    def exists(self, namespace, name):
+        try:
+            self.head(namespace, name)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def delete(self, namespace, name):
+        self.client.delete_object(Bucket=self.bucket, Key=self.key(namespace, name))
+
+    def list_objects(self, namespace):
+        prefix = self.key(namespace, '') + '/'
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for item in page.get('Contents', []):
+                name = item['Key'][len(prefix):]
+                if name and '/' not in name:
+                    yield name, item['LastModified']
+
+    def list(self, namespace):
+        return [name for name, _ in self.list_objects(namespace)]
+
+    def age(self, namespace, name):
+        return time.time() - self.head(namespace, name)['LastModified'].timestamp()
+
+    def cleanup(self, namespace, max_age):
+        # Use the listing timestamps instead of one HEAD request per object
+        current_time = time.time()
+        for name, last_modified in self.list_objects(namespace):
+            if current_time - last_modified.timestamp() > max_age:
+                try:
+                    self.delete(namespace, name)
+                    print(f"[Cleanup] Removed old file: {namespace}/{name}")
+                except Exception as e:
+                    print(f"[Cleanup] Error removing {namespace}/{name}: {e}")
+
+
+def create_storage(backend, namespaces, root='.', tmpfs_root='/dev/shm/slide_harmony',
+                   small_file_size=8 * 1024 * 1024, hot_namespaces=(), s3_bucket=None,
+                   s3_prefix='', s3_endpoint_url=None):
+    """Create the storage backend selected by name"""
+    if backend == 'local':
+        return LocalDiskStorage(root, namespaces)
+    if backend == 'tmpfs':
+        return TmpfsStorage(tmpfs_root, namespaces)
+    if backend == 'memory':
+        return MemoryStorage()
+    if backend == 'tiered':
+        # Chunks and small files share the tmpfs tier so every worker sees them,
+        # requests spool small files in memory before they reach it
+        tmpfs = TmpfsStorage(tmpfs_root, namespaces)
+        return TieredStorage(
+            hot=tmpfs,
+            small=tmpfs,
+            large=LocalDiskStorage(root, namespaces),
+            small_file_size=small_file_size,
+            hot_namespaces=hot_namespaces
+        )
+    if backend == 's3':
+        if not s3_bucket:
+            raise ValueError("S3_BUCKET must be set for the s3 storage backend")
+        return S3Storage(s3_bucket, prefix=s3_prefix, endpoint_url=s3_endpoint_url, spool_size=small_file_size)
+    raise ValueError(f"Unknown storage backend: {backend}")
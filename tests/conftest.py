@@ -0,0 +1,23 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+# Make app modules importable from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """Import app.py from a scratch directory, it creates its storage folders on import"""
+    pytest.importorskip('flask')
+    pytest.importorskip('pptx')
+    pytest.importorskip('deep_translator')
+
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('app'))
+    try:
+        yield importlib.import_module('app')
+    finally:
+        os.chdir(cwd)
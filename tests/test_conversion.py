@@ -0,0 +1,118 @@
+import io
+import threading
+import time
+
+import pytest
+
+from storage import LocalDiskStorage
+
+
+class FakeTranslator:
+    """Stands in for GoogleTranslator, failing texts the way tests configure"""
+
+    calls = {}
+    failures = {}  # text -> exceptions to raise on the first calls
+    on_call = None
+    lock = threading.Lock()
+
+    def __init__(self, source, target):
+        pass
+
+    def translate(self, text):
+        # en_to_ar formatting wraps runs in RTL marks before they are translated
+        text = text.strip('\u200f')
+        with FakeTranslator.lock:
+            FakeTranslator.calls[text] = FakeTranslator.calls.get(text, 0) + 1
+            pending_failures = FakeTranslator.failures.get(text)
+            error = pending_failures.pop(0) if pending_failures else None
+        if FakeTranslator.on_call:
+            FakeTranslator.on_call(text)
+        if error:
+            raise error
+        return f'T({text})'
+
+
+@pytest.fixture
+def converter(app_module, monkeypatch, tmp_path):
+    """convert_pptx wired to a scratch storage and the fake translator"""
+    storage = LocalDiskStorage(str(tmp_path), [app_module.UPLOAD_FOLDER, app_module.CONVERTED_FOLDER])
+    monkeypatch.setattr(app_module, 'file_storage', storage)
+    monkeypatch.setattr(app_module, 'GoogleTranslator', FakeTranslator)
+    monkeypatch.setattr(app_module, 'MEMORY_CLEANUP_DELAY', 0)
+    monkeypatch.setattr(app_module, 'TRANSLATION_RETRY_DELAY', 0)
+    monkeypatch.setattr(app_module, 'PIPELINE_QUEUE_SIZE', 1)
+    monkeypatch.setattr(FakeTranslator, 'calls', {})
+    monkeypatch.setattr(FakeTranslator, 'failures', {})
+    monkeypatch.setattr(FakeTranslator, 'on_call', None)
+
+    def convert(slide_texts):
+        from pptx import Presentation
+        from pptx.util import Inches
+
+        prs = Presentation()
+        for texts in slide_texts:
+            slide = prs.slides.add_slide(prs.slide_layouts[6])
+            for index, text in enumerate(texts):
+                textbox = slide.shapes.add_textbox(Inches(1), Inches(1 + index), Inches(4), Inches(1))
+                textbox.text_frame.text = text
+        deck = io.BytesIO()
+        prs.save(deck)
+        deck.seek(0)
+        storage.save(app_module.UPLOAD_FOLDER, 'deck.pptx', deck)
+
+        status = app_module.convert_pptx('deck.pptx', 'out.pptx')
+        if status != 'completed':
+            return status, None
+        with storage.open(app_module.CONVERTED_FOLDER, 'out.pptx') as converted:
+            result = Presentation(converted)
+        return status, [[shape.text_frame.text for shape in slide.shapes] for slide in result.slides]
+
+    yield convert
+    app_module.reset_abort()
+
+
+def test_distinct_texts_are_translated_once(converter):
+    status, slides = converter([['Hello', 'World'], ['Hello'], ['World', '42']])
+
+    assert status == 'completed'
+    assert FakeTranslator.calls == {'Hello': 1, 'World': 1}
+    assert slides == [['T(Hello)', 'T(World)'], ['T(Hello)'], ['T(World)', '‏٤٢‏']]
+
+
+def test_rate_limited_translation_is_retried(app_module, converter):
+    FakeTranslator.failures['Hello'] = [app_module.TooManyRequests()]
+
+    status, slides = converter([['Hello']])
+
+    assert status == 'completed'
+    assert FakeTranslator.calls == {'Hello': 2}
+    assert slides == [['T(Hello)']]
+
+
+def test_failed_translation_is_retried_for_later_runs(converter):
+    # Not a transient error, so the first slide keeps its text
+    FakeTranslator.failures['Broken'] = [ValueError('bad response')]
+
+    status, slides = converter([['Broken']] + [['Filler %d' % i] for i in range(3)] + [['Broken']])
+
+    assert status == 'completed'
+    assert FakeTranslator.calls['Broken'] == 2
+    assert slides[-1] == ['T(Broken)']
+
+
+def test_abort_does_not_hang(app_module, converter):
+    def abort_and_wait(text):
+        app_module.abort_event.set()
+        time.sleep(0.05)
+
+    FakeTranslator.on_call = abort_and_wait
+    result = {}
+    conversion = threading.Thread(
+        target=lambda: result.update(outcome=converter([['Text %d' % i] for i in range(20)]))
+    )
+    conversion.start()
+    conversion.join(timeout=30)
+
+    assert not conversion.is_alive()
+    assert result['outcome'] == ('aborted', None)
+    assert sum(FakeTranslator.calls.values()) < 20
@@ -0,0 +1,116 @@
+import io
+import os
+import socket
+
+import pytest
+
+from storage import LocalDiskStorage, TieredStorage, create_storage
+
+NAMESPACES = ['uploads', 'converted', 'chunks']
+
+
+class FailingStream(io.BytesIO):
+    """Stream that breaks after the first read, like a client disconnecting mid-chunk"""
+
+    def read(self, size=-1):
+        if self.tell():
+            raise ConnectionError("client disconnected")
+        return super().read(4)
+
+
+def test_local_save_failure_removes_partial_file(tmp_path):
+    storage = LocalDiskStorage(str(tmp_path), NAMESPACES)
+
+    with pytest.raises(ConnectionError):
+        storage.save('chunks', 'deck.pptx.chunk_0', FailingStream(b'partial data'))
+
+    assert os.listdir(tmp_path / 'chunks') == []
+
+
+
+def test_local_cleanup_keeps_files_of_running_jobs(tmp_path):
+    storage = LocalDiskStorage(str(tmp_path), NAMESPACES)
+    storage.save('chunks', 'running.pptx.chunk_0', io.BytesIO(b'in progress'))
+    storage.save('chunks', 'stale.pptx.chunk_0', io.BytesIO(b'abandoned'))
+    (tmp_path / 'chunks' / 'stale.pptx.chunk_1.123.part').write_bytes(b'partial')
+    (tmp_path / 'chunks' / 'old_chunk_folder').mkdir()
+    hour_ago = os.path.getmtime(tmp_path / 'chunks') - 3600
+    for name in ('stale.pptx.chunk_0', 'stale.pptx.chunk_1.123.part', 'old_chunk_folder'):
+        os.utime(tmp_path / 'chunks' / name, (hour_ago, hour_ago))
+
+    storage.cleanup('chunks', 60)
+
+    assert os.listdir(tmp_path / 'chunks') == ['running.pptx.chunk_0']
+
+def test_tiered_failed_save_keeps_existing_copy(tmp_path):
+    small = LocalDiskStorage(str(tmp_path / 'small'), NAMESPACES)
+    large = LocalDiskStorage(str(tmp_path / 'large'), NAMESPACES)
+    storage = TieredStorage(hot=small, small=small, large=large, small_file_size=8, hot_namespaces=['chunks'])
+    storage.save('uploads', 'deck.pptx', io.BytesIO(b'a large original deck'))
+
+    with pytest.raises(ConnectionError):
+        storage.save('uploads', 'deck.pptx', FailingStream(b'small'))
+
+    with storage.open('uploads', 'deck.pptx') as stored:
+        assert stored.read() == b'a large original deck'
+
+
+def test_tiered_keeps_small_files_on_tmpfs(tmp_path):
+    storage = create_storage(
+        'tiered', NAMESPACES, root=str(tmp_path / 'disk'), tmpfs_root=str(tmp_path / 'shm'),
+        small_file_size=8, hot_namespaces=['chunks']
+    )
+    storage.save('uploads', 'small.pptx', io.BytesIO(b'small'))
+    storage.save('uploads', 'large.pptx', io.BytesIO(b'a large deck'))
+    storage.save('chunks', 'large.pptx.chunk_0', io.BytesIO(b'a large chunk'))
+
+    assert os.listdir(tmp_path / 'shm' / 'uploads') == ['small.pptx']
+    assert os.listdir(tmp_path / 'shm' / 'chunks') == ['large.pptx.chunk_0']
+    assert os.listdir(tmp_path / 'disk' / 'uploads') == ['large.pptx']
+    assert sorted(storage.list('uploads')) == ['large.pptx', 'small.pptx']
+
+
+@pytest.fixture
+def s3_endpoint(monkeypatch):
+    """Local S3 stand-in server"""
+    boto3 = pytest.importorskip('boto3')
+    server_module = pytest.importorskip('moto.server')
+
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    server = server_module.ThreadedMotoServer(ip_address='127.0.0.1', port=port, verbose=False)
+    server.start()
+    endpoint_url = f'http://127.0.0.1:{port}'
+    boto3.client('s3', endpoint_url=endpoint_url).create_bucket(Bucket='slide-harmony')
+    yield endpoint_url
+    server.stop()
+
+
+def test_s3_storage(s3_endpoint):
+    storage = create_storage('s3', NAMESPACES, s3_bucket='slide-harmony', s3_prefix='jobs', s3_endpoint_url=s3_endpoint)
+
+    storage.save('uploads', 'deck.pptx', io.BytesIO(b'deck contents'))
+
+    assert storage.exists('uploads', 'deck.pptx')
+    assert not storage.exists('uploads', 'missing.pptx')
+    assert storage.list('uploads') == ['deck.pptx']
+    assert storage.list('converted') == []
+    with storage.open('uploads', 'deck.pptx') as stored:
+        assert stored.read() == b'deck contents'
+    assert 0 <= storage.age('uploads', 'deck.pptx') < 60
+
+    with pytest.raises(FileNotFoundError):
+        storage.open('uploads', 'missing.pptx')
+    with pytest.raises(FileNotFoundError):
+        storage.age('uploads', 'missing.pptx')
+
+    storage.cleanup('uploads', 3600)
+    assert storage.list('uploads') == ['deck.pptx']
+    storage.cleanup('uploads', -1)
+    assert storage.list('uploads') == []
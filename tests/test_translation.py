@@ -0,0 +1,45 @@
+import pytest
+
+
+@pytest.mark.parametrize('text, direction, expected', [
+    # Needs the translator
+    ('Hello world', 'en_to_ar', 'translate'),
+    ('Q3 2024 results', 'en_to_ar', 'translate'),
+    ('Café', 'en_to_ar', 'translate'),
+    ('مرحبا بالعالم', 'ar_to_en', 'translate'),
+    ('الربع ٣', 'ar_to_en', 'translate'),
+    # Digits only need converting
+    ('123', 'en_to_ar', 'transliterate'),
+    ('45%', 'en_to_ar', 'transliterate'),
+    ('‏١٢٣‏', 'en_to_ar', 'transliterate'),
+    ('١٢٫٥٪', 'ar_to_en', 'transliterate'),
+    ('3×4', 'en_to_ar', 'transliterate'),
+    ('10 ÷ 2', 'en_to_ar', 'transliterate'),
+    # URLs, emails and bare domains
+    ('https://example.com/pricing', 'en_to_ar', 'passthrough'),
+    ('www.example.com', 'en_to_ar', 'passthrough'),
+    ('example.com/pricing', 'en_to_ar', 'passthrough'),
+    ('shop.example.sa', 'ar_to_en', 'passthrough'),
+    ('sales@example.com', 'en_to_ar', 'passthrough'),
+    # Bullets and punctuation
+    ('•', 'en_to_ar', 'passthrough'),
+    ('—', 'ar_to_en', 'passthrough'),
+    ('‏', 'en_to_ar', 'passthrough'),
+    # Already in the target script
+    ('مرحبا بالعالم', 'en_to_ar', 'passthrough'),
+    ('Hello world', 'ar_to_en', 'passthrough'),
+])
+def test_classify_text(app_module, text, direction, expected):
+    assert app_module.classify_text(text, direction) == expected
+
+
+@pytest.mark.parametrize('text, direction, expected', [
+    ('2024', 'en_to_ar', '٢٠٢٤'),
+    ('3×4', 'en_to_ar', '٣×٤'),
+    ('١٢٫٥٪', 'ar_to_en', '12.5%'),
+    ('١٬٠٠٠', 'ar_to_en', '1,000'),
+    ('۱۲۳', 'ar_to_en', '123'),
+    ('‏٣٫٥٪‏', 'ar_to_en', '‏3.5%‏'),
+])
+def test_transliterate_digits(app_module, text, direction, expected):
+    assert app_module.transliterate_digits(text, direction) == expected